@@ -0,0 +1,378 @@
+from collections import namedtuple
+import gc
+import os
+import numba
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+import sys
+
+# Column names and time-of-use windows of each kind of results CSV
+# Rate windows are (rate, start hour, end hour) and are applied over the day rate in order,
+# so a later window overrides an earlier one where they overlap
+schemas = {
+    'milp': {
+        'time': 'time',
+        # P_source_destination is the naming scheme in the MILP CSV
+        # All P_grid_x represent power from grid (purchasing power)
+        'purchase': ['P_grid_household', 'P_grid_battery'],
+        # P_solar_grid is power from solar to grid (feed in power)
+        'feed_in': 'P_solar_grid',
+        # load_demand is the consumption power
+        'consumption': 'load_demand',
+        # solar_production is the production power
+        'production': 'solar_production',
+        # Night: 23:00 to 08:00, Peak: 17:00 to 19:00, Day: all other times
+        'rate_windows': [('night_rate', 23, 8), ('peak_rate', 17, 19)],
+    },
+    'rule_based': {
+        'time': 'updated_time',
+        # Negative grid power is power drawn from the grid (purchasing power)
+        'purchase_neg': 'grid_power_w',
+        'feed_in': 'feed_in_power_w',
+        'consumption': 'consumption_power_w',
+        'production': 'production_power_w',
+        # Night: 23:00 to 08:00, Boost: 02:00 to 04:00, Day: all other times
+        'rate_windows': [('night_rate', 23, 8), ('boost_rate', 2, 4)],
+    },
+}
+
+# Power readings in watts fit comfortably in float32, which halves the memory read by the reductions
+power_dtype = np.float32
+
+# Summary metrics returned by calculate_summary and summarize_csv
+Summary = namedtuple('Summary', ['total_energy_consumed', 'total_energy_purchased', 'total_cost',
+                                 'total_energy_produced', 'total_energy_sold', 'total_revenue',
+                                 'net_cost', 'independence_percent', 'co2_produced'])
+
+# CSV files larger than this (in bytes) are summarized in chunks with summarize_csv
+# instead of being loaded whole with load_csv_data
+chunked_file_size = 500 * 1024 * 1024
+
+# Running totals (in watts) accumulated by update_totals
+total_names = ['tot_purch', 'tot_feed', 'tot_cons', 'tot_prod', 'tot_cost']
+
+def _read_options(schema):
+    """
+    Read only the columns needed for the summary, with the power columns as power_dtype
+    and the time column as text for _parse_times
+    """
+    layout = schemas[schema]
+    power_columns = (layout.get('purchase', [])
+                     + [layout[key] for key in ('purchase_neg', 'feed_in', 'consumption', 'production') if key in layout])
+    return {
+        'usecols': [layout['time']] + power_columns,
+        'dtype': {layout['time']: str, **{column: power_dtype for column in power_columns}},
+    }
+
+def _parse_times(df, schema):
+    """
+    Parse the time column to datetime objects in place, keeping any UTC offset so hours stay on the local clock
+    """
+    time_column = schemas[schema]['time']
+    df[time_column] = pd.to_datetime(df[time_column])
+
+def _read_csv(file_path, schema):
+    """
+    Read the columns needed for the summary from a CSV file
+    """
+    read_options = _read_options(schema)
+    try:
+        # pyarrow parses the CSV using multiple threads
+        # The time column is read as text, as pyarrow would convert timestamps with a UTC offset to UTC
+        # and shift the tariff hours away from the local wall clock
+        column_types = {column: pa.string() if dtype is str else pa.from_numpy_dtype(dtype)
+                        for column, dtype in read_options['dtype'].items()}
+        convert_options = pyarrow.csv.ConvertOptions(include_columns=read_options['usecols'],
+                                                     column_types=column_types)
+        df = pyarrow.csv.read_csv(file_path, convert_options=convert_options).to_pandas()
+    except pa.ArrowInvalid:
+        # Fall back to the pandas parser if pyarrow cannot parse the file
+        df = pd.read_csv(file_path, **read_options)
+
+    _parse_times(df, schema)
+    return df
+
+def _read_cache(cache_path, schema):
+    """
+    Read a Parquet cache of a CSV file, returning None if it cannot be used
+    """
+    try:
+        df = pd.read_parquet(cache_path)
+    except Exception:
+        # An unreadable cache (e.g. a partial file from an older interrupted run) is treated as a miss
+        return None
+
+    # A cache written with other columns (e.g. for another schema) is not reused
+    if set(df.columns) != set(_read_options(schema)['usecols']):
+        return None
+    return df
+
+def _write_cache(df, cache_path):
+    """
+    Write a Parquet cache of a CSV file, replacing any previous cache in one step
+    """
+    # Write to a temporary file next to the cache and move it into place,
+    # so an interrupted write never leaves a partial cache behind
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(temp_path, compression='zstd')
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        # The cache only speeds up later runs, so carry on without it
+        print(f"Could not cache data to {cache_path}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def load_csv_data(file_path, schema):
+    """
+    Load and process data from a CSV file, reusing a Parquet cache of it when up to date
+    """
+    # The parsed data is cached next to the CSV and reused until the CSV is modified
+    cache_path = file_path + '.parquet'
+    try:
+        df = None
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+            df = _read_cache(cache_path, schema)
+
+        if df is None:
+            df = _read_csv(file_path, schema)
+            _write_cache(df, cache_path)
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        sys.exit(1)
+
+    # Work out the tariff period of every time step once, so later calculations reuse it
+    df['_hour_cat'] = _hour_categories(df, schema)
+
+    return df
+
+def _power_array(df, column):
+    """
+    Get a power column as a power_dtype array, keeping NaN values for _fused_totals to skip
+    """
+    return df[column].to_numpy(dtype=power_dtype)
+
+def _filled_power_array(df, column):
+    """
+    Copy a power column into a power_dtype array, replacing NaN values with 0 in place
+    """
+    power = df[column].to_numpy(dtype=power_dtype, copy=True)
+    return np.nan_to_num(power, copy=False)
+
+def _period_by_hour(rate_windows):
+    """
+    Build a 24 entry table of the tariff period code of each hour of the day, where 0 is the day rate
+    """
+    period_by_hour = np.zeros(24, dtype=np.int8)  # Day: all other times
+    for code, (rate_name, start, end) in enumerate(rate_windows, start=1):
+        if start < end:
+            period_by_hour[start:end] = code
+        else:
+            # The window wraps around midnight
+            period_by_hour[start:] = code
+            period_by_hour[:end] = code
+    return period_by_hour
+
+def _hour_categories(df, schema):
+    """
+    Get the tariff period of each time step as a categorical with int8 codes, named by rate
+    Every code is in 0..len(categories) - 1, with 0 (day rate) for time steps without a timestamp
+    """
+    layout = schemas[schema]
+    period_names = ['day_rate'] + [rate_name for rate_name, start, end in layout['rate_windows']]
+    hours = df[layout['time']].dt.hour
+    # Time steps without a timestamp have no hour and keep the day rate (code 0)
+    has_hour = hours.notna().to_numpy()
+    codes = np.zeros(len(hours), dtype=np.int8)
+    codes[has_hour] = _period_by_hour(layout['rate_windows'])[hours[has_hour].to_numpy(dtype=np.int64)]
+    return pd.Categorical.from_codes(codes, categories=period_names)
+
+# All fast-math flags except nnan/ninf, which would let the compiler drop the NaN checks
+# parallel=True splits the prange loop across CPU cores, with a partial sum per thread for each total
+@numba.njit(parallel=True, cache=True, fastmath={'reassoc', 'contract', 'nsz', 'arcp', 'afn'})
+def _fused_totals(purchasing, feed_in, consumption, production, periods, rate_by_period):
+    """
+    Sum each power series and the rate-weighted purchasing power in a single pass over the data
+    """
+    # The float32 power readings are accumulated in float64 so long series keep their precision
+    tot_purch = 0.0
+    tot_feed = 0.0
+    tot_cons = 0.0
+    tot_prod = 0.0
+    tot_cost = 0.0
+    for i in numba.prange(periods.shape[0]):
+        # Gather the time-of-use rate for this tariff period from the table
+        rate = rate_by_period[periods[i]]
+        tot_purch += purchasing[i]
+        # Missing readings are skipped here rather than zero-filled in a separate pass (x != x only for NaN)
+        feed = feed_in[i]
+        cons = consumption[i]
+        prod = production[i]
+        tot_feed += feed if feed == feed else 0.0
+        tot_cons += cons if cons == cons else 0.0
+        tot_prod += prod if prod == prod else 0.0
+        tot_cost += purchasing[i] * rate
+    return tot_purch, tot_feed, tot_cons, tot_prod, tot_cost
+
+def update_totals(df, totals, cost_params, schema):
+    """
+    Add the power totals of a block of data to the running totals
+    """
+    layout = schemas[schema]
+
+    # Extract relevant columns, NaN values are skipped when summing
+    if 'purchase' in layout:
+        # Purchase flows are zero-filled first so a gap in one does not hide the others,
+        # then added into the first flow's buffer rather than a new array
+        purchase_columns = layout['purchase']
+        purchasing_power = _filled_power_array(df, purchase_columns[0])
+        for column in purchase_columns[1:]:
+            np.add(purchasing_power, _filled_power_array(df, column), out=purchasing_power)
+    else:
+        # Negative grid power is power drawn from the grid, so negate it and clip exports to 0
+        # np.fmax also turns NaN readings into 0 in the same operation
+        purchasing_power = np.fmax(-_power_array(df, layout['purchase_neg']), 0.0)
+    feed_in_power = _power_array(df, layout['feed_in'])
+    consumption_power = _power_array(df, layout['consumption'])
+    production_power = _power_array(df, layout['production'])
+
+    # Tariff period of each time step, precomputed by load_csv_data when available
+    if '_hour_cat' in df:
+        hour_cat = df['_hour_cat'].array
+    else:
+        hour_cat = _hour_categories(df, schema)
+    periods = hour_cat.codes
+
+    # Look up the time-of-use rate of each tariff period once
+    rate_by_period = np.array([cost_params[rate_name] for rate_name in hour_cat.categories])
+
+    # Sum every power series and the cost-weighted purchasing power in one pass over the data
+    chunk_totals = _fused_totals(
+        purchasing_power, feed_in_power, consumption_power, production_power, periods, rate_by_period)
+    for name, value in zip(total_names, chunk_totals):
+        totals[name] += float(value)
+
+def finalize_summary(totals, cost_params):
+    """
+    Calculate summary metrics from the running power totals
+    """
+    # Define time interval
+    time_diff = 5/60
+    # Convert from watts to kWh by multiplying by time interval (hours) and dividing by 1000
+    factor = time_diff / 1000
+
+    # Running totals in watts
+    tot_purch = totals['tot_purch']
+    tot_feed = totals['tot_feed']
+    tot_cons = totals['tot_cons']
+    tot_prod = totals['tot_prod']
+    tot_cost = totals['tot_cost']
+
+    # Calculate total energy purchased from grid (kWh)
+    total_energy_purchased = tot_purch * factor
+
+    # Calculate total energy produced by the household in kWh
+    total_energy_produced = tot_prod * factor
+
+    # Calculate total energy sold to grid (kWh)
+    total_energy_sold = tot_feed * factor
+
+    # Calculate total cost of energy purchased (euros) using time-of-use rates
+    # Convert from watts to kilowatts and multiply by time interval (the rates were applied per time step in update_totals)
+    total_cost = round(tot_cost * factor, 2)
+
+    # Calculate total revenue from selling energy back to the grid (euros)
+    # total_energy_sold is already in kWh, so just multiply by the sell price
+    total_revenue = round(total_energy_sold * cost_params['sell_price'], 2)
+
+    # Calculate system independence from grid (percent)
+    # Convert from watts to kWh
+    total_consumption = tot_cons * factor
+    # grid_consumption == total_energy_purchased
+
+    if total_consumption > 0:
+        # Calculate independence as the percentage of consumption not met by grid
+        independence_percent = min(100, (1 - total_energy_purchased / total_consumption) * 100)
+    else:
+        independence_percent = 100  # If no consumption, system is 100% independent
+
+    # Calculate CO2 emissions reduced
+    # Formula: (consumption from grid - solar production) * GEF
+    # Convert from watts to kWh
+    production_power_kwh = tot_prod * factor
+
+    # Grid Emission Factor: 0.331 kg CO2 per kWh - Irish average
+    gef = 0.331
+    # total_solar_utilized is already in kWh
+    co2_produced = total_energy_purchased * gef
+
+    return Summary(
+        total_energy_consumed=total_consumption,
+        total_energy_purchased=total_energy_purchased,
+        total_cost=total_cost,
+        total_energy_produced=total_energy_produced,
+        total_energy_sold=total_energy_sold,
+        total_revenue=total_revenue,
+        net_cost=total_cost - total_revenue,
+        independence_percent=independence_percent,
+        co2_produced=co2_produced
+    )
+
+def calculate_summary(df, cost_params, schema):
+    """
+    Calculate summary metrics based on the data and specified rates
+    """
+    totals = dict.fromkeys(total_names, 0.0)
+    update_totals(df, totals, cost_params, schema)
+    return finalize_summary(totals, cost_params)
+
+def _read_csv_chunks(file_path, schema, chunksize):
+    """
+    Read the columns needed for the summary from a CSV file in chunks of rows
+    """
+    try:
+        with pd.read_csv(file_path, chunksize=chunksize, **_read_options(schema)) as reader:
+            for chunk in reader:
+                _parse_times(chunk, schema)
+                yield chunk
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        sys.exit(1)
+
+def summarize_csv(file_path, cost_params, schema, chunksize=200_000):
+    """
+    Calculate summary metrics from a CSV file read in chunks, so memory use stays bounded for large files
+    """
+    totals = dict.fromkeys(total_names, 0.0)
+    for chunk in _read_csv_chunks(file_path, schema, chunksize):
+        # A header-only file has nothing to add
+        if chunk.empty:
+            continue
+        update_totals(chunk, totals, cost_params, schema)
+        # Release each chunk before reading the next one
+        del chunk
+        gc.collect()
+
+    return finalize_summary(totals, cost_params)
+
+def print_summary(summary):
+    """
+    Print the summary metrics in a formatted way - .2f means fixed-point number with 2 decimal places
+    """
+    print("\nEnergy System Summary:")
+    print(f"Total energy consumed by household: {summary.total_energy_consumed:.2f} kWh")
+    print(f"Total energy purchased from the grid: {summary.total_energy_purchased:.2f} kWh")
+    print(f"Total cost of energy purchased: €{summary.total_cost:.2f}")
+    print(f"Total energy produced by household: {summary.total_energy_produced:.2f} kWh")
+    print(f"Total energy sold to the grid: {summary.total_energy_sold:.2f} kWh")
+    print(f"Total revenue from energy sold: €{summary.total_revenue:.2f}")
+    print(f"Net cost: €{summary.net_cost:.2f}")
+
+    print(f"System independence from the grid: {summary.independence_percent:.2f}%")
+    print(f"CO2 emissions produced: {summary.co2_produced:.2f} kg")
+
+    # Add a note about net production if applicable
+    if summary.total_energy_sold > summary.total_energy_purchased:
+        print("\nNote: This system is a net producer, exporting more energy to the grid than it imports.")